@@ -1,21 +1,72 @@
 import discord
 from discord.ext import commands
 import sqlite3
+import threading
+import queue
 import os
+import re
 import aiohttp
+import orjson
+import yarl
 import asyncio
+import functools
+from cachetools import LRUCache, TTLCache
+
+# Use uvloop when available (not supported on Windows)
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 # --- Configuration ---
 TOKEN = os.getenv('DISCORD_TOKEN')
 WEATHER_API_KEY = os.getenv('WEATHER_API_KEY')
 DB_PATH = "/data/weather.db"
 
+# Accepted spellings for the .units command
+_METRIC = frozenset({'c', 'metric', 'celsius', 'ca'})
+_IMPERIAL = frozenset({'f', 'imperial', 'fahrenheit', 'us'})
+
+# (temperature, wind speed) labels per unit system
+LABELS = {'imperial': ("°F", "mph"), 'metric': ("°C", "m/s")}
+
+# A 5-digit US zip code, surrounding whitespace allowed
+_ZIP_RE = re.compile(r'^\s*(\d{5})\s*$')
+
+# A user mention (<@id> / <@!id>) or a raw user id
+_MENTION_RE = re.compile(r'^<@!?(\d+)>$|^(\d{17,20})$')
+
+# Embed styling
+EMBED_COLOR = 0x3498db
+ICON_BASE = "https://openweathermap.org/img/wn/"
+_EMBED_TEMPLATE = {'type': 'rich', 'color': EMBED_COLOR}
+_EMBED_FIELDS = ("Temperature", "Feels Like", "Humidity", "Wind Speed")
+
+# API endpoints, parsed once; per-request values go in the params= argument
+ZIPPO_URL = yarl.URL("https://api.zippopotam.us/us/")
+GEO_ZIP_URL = yarl.URL("https://api.openweathermap.org/geo/1.0/zip")
+GEO_DIRECT_URL = yarl.URL("https://api.openweathermap.org/geo/1.0/direct")
+WEATHER_URL = yarl.URL("https://api.openweathermap.org/data/2.5/weather")
+
 # --- Database Setup ---
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-conn = sqlite3.connect(DB_PATH)
+conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
 cursor = conn.cursor()
 
-# Create table with 'units' column default to imperial (Fahrenheit)
+# WAL + NORMAL sync: one fsync per commit and readers never block on writers.
+# The rest keeps the (small) working set in memory.
+cursor.executescript('''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-20000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+''')
+
+# Create table with 'units' column default to imperial (Fahrenheit).
+# user_id INTEGER PRIMARY KEY aliases the rowid, so a lookup by id is a
+# single b-tree descent with no separate index.
 cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
         user_id INTEGER PRIMARY KEY,
@@ -23,71 +74,384 @@ cursor.execute('''
         units TEXT DEFAULT 'imperial'
     )
 ''')
+
+# Geocoded US zips (a zip never moves), so a restart doesn't have to
+# look them all up again
+cursor.execute('''
+    CREATE TABLE IF NOT EXISTS zip_cache (
+        zip TEXT PRIMARY KEY,
+        lat REAL,
+        lon REAL,
+        name TEXT
+    )
+''')
 conn.commit()
 
 # Migration: Check if 'units' column exists, add it if not
-try:
-    cursor.execute("SELECT units FROM users LIMIT 1")
-except sqlite3.OperationalError:
+columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)")}
+if 'units' not in columns:
     print("Migrating database: Adding 'units' column...")
     cursor.execute("ALTER TABLE users ADD COLUMN units TEXT DEFAULT 'imperial'")
     conn.commit()
 
+# --- Queries ---
+# Kept as constants so every call hits sqlite3's prepared-statement cache.
+# Each upsert only touches its own column, leaving the other one as saved.
+SAVE_UNITS_SQL = '''
+    INSERT INTO users (user_id, units) VALUES (?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET units=excluded.units
+'''
+SAVE_LOCATION_SQL = '''
+    INSERT INTO users (user_id, location) VALUES (?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET location=excluded.location
+'''
+LOAD_ZIP_SQL = 'SELECT lat, lon, name FROM zip_cache WHERE zip = ?'
+SAVE_ZIP_SQL = 'INSERT OR REPLACE INTO zip_cache (zip, lat, lon, name) VALUES (?, ?, ?, ?)'
+
+# --- User Profile Cache ---
+# Every profile is kept in memory as user_id -> (location, units) so the
+# command path never has to read from SQLite. Writes update both.
+_profiles = {
+    user_id: (location, units or 'imperial')
+    for user_id, location, units in cursor.execute('SELECT user_id, location, units FROM users')
+}
+
+def get_profile(user_id: int) -> tuple[str | None, str]:
+    """Returns (location, units) for a user, defaulting to no location / imperial."""
+    return _profiles.get(user_id, (None, 'imperial'))
+
+# --- Database Writer ---
+# All writes go through one background thread so a commit's fsync never
+# stalls the event loop. Writes that queue up while a commit is running
+# are committed together in the next transaction; if that fails, they are
+# retried one by one so a bad write only fails its own caller.
+_db_lock = threading.Lock()
+_write_queue = queue.Queue()
+
+def _resolve_write(fut: asyncio.Future, error: Exception | None) -> None:
+    if fut.cancelled():
+        return
+    if error is None:
+        fut.set_result(None)
+    else:
+        fut.set_exception(error)
+
+def _commit(statements: list) -> None:
+    """Runs (sql, params) statements in one transaction, rolling back on any error."""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for sql, params in statements:
+            conn.execute(sql, params)
+        conn.execute('COMMIT')
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        raise
+
+def _writer() -> None:
+    while True:
+        batch = [_write_queue.get()]
+        while True:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        with _db_lock:
+            try:
+                _commit([(sql, params) for sql, params, _, _ in batch])
+                errors = [None] * len(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"Database write failed: {e}")
+                    errors = [e]
+                else:
+                    # Retry one at a time so only the bad statement fails
+                    errors = []
+                    for sql, params, _, _ in batch:
+                        try:
+                            _commit([(sql, params)])
+                            errors.append(None)
+                        except Exception as e:
+                            print(f"Database write failed: {e}")
+                            errors.append(e)
+
+        for (_, _, loop, fut), error in zip(batch, errors):
+            try:
+                loop.call_soon_threadsafe(_resolve_write, fut, error)
+            except RuntimeError:
+                # The caller's loop has already shut down
+                pass
+
+threading.Thread(target=_writer, name="db-writer", daemon=True).start()
+
+def db_write(sql: str, params: tuple) -> asyncio.Future:
+    """Queues a write statement; returns a future that resolves once it is committed."""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    _write_queue.put((sql, params, loop, fut))
+    return fut
+
+async def save_profile(user_id: int, field: str, value: str) -> None:
+    """Writes one profile field ('location' or 'units') through the cache.
+
+    The field is merged into the user's current entry at write time, so a
+    concurrent change to the other field is never overwritten. If the write
+    fails, the entry is reverted only if no newer write has replaced it.
+    """
+    previous = _profiles.get(user_id)
+    location, units = get_profile(user_id)
+    if field == 'location':
+        profile, sql = (value, units), SAVE_LOCATION_SQL
+    else:
+        profile, sql = (location, value), SAVE_UNITS_SQL
+
+    _profiles[user_id] = profile
+    try:
+        await db_write(sql, (user_id, value))
+    except Exception:
+        if _profiles.get(user_id) is profile:
+            if previous is None:
+                _profiles.pop(user_id, None)
+            else:
+                _profiles[user_id] = previous
+        raise
+
+def load_zip(zip_code: str) -> tuple | None:
+    """Reads a persisted zip geocode as (lat, lon, name, country). Blocking; use asyncio.to_thread."""
+    with _db_lock:
+        row = conn.execute(LOAD_ZIP_SQL, (zip_code,)).fetchone()
+    return (row[0], row[1], row[2], "US") if row else None
+
 # --- Bot Setup ---
 intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='.', intents=intents)
 
-async def get_weather_data(query, units):
-    async with aiohttp.ClientSession() as session:
-        
-        lat, lon = None, None
-        official_name = None
-        country = "US"
-
-        # --- PATH A: US ZIP CODE LOOKUP (Zippopotam) ---
-        # We use this to get the "Postal City" name (e.g. Highlands Ranch)
-        # instead of the County name (Douglas County).
-        if query.replace(" ", "").isdigit() and len(query.strip()) == 5:
-            try:
-                zip_url = f"http://api.zippopotam.us/us/{query.strip()}"
-                async with session.get(zip_url) as zip_resp:
-                    if zip_resp.status == 200:
-                        zip_data = await zip_resp.json()
-                        place = zip_data['places'][0]
-                        official_name = place['place name']
-                        lat = place['latitude']
-                        lon = place['longitude']
-                        country = "US"
-            except Exception as e:
-                print(f"Zippopotam lookup failed: {e}")
-
-        # --- PATH B: OPENWEATHERMAP FALLBACK ---
-        # If Path A failed or it's not a zip, use standard OWM Geocoding
-        if not lat or not lon:
-            geo_url = f"http://api.openweathermap.org/geo/1.0/direct?q={query}&limit=1&appid={WEATHER_API_KEY}"
-            async with session.get(geo_url) as geo_resp:
-                if geo_resp.status != 200: return None
-                geo_data = await geo_resp.json()
-                
-                if not geo_data: return None
-                location_info = geo_data[0]
-                
-                lat = location_info['lat']
-                lon = location_info['lon']
-                official_name = location_info['name']
-                country = location_info.get('country', 'US')
-
-        # --- STEP 3: FETCH WEATHER ---
-        weather_url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={WEATHER_API_KEY}&units={units}"
-        
-        async with session.get(weather_url) as weather_resp:
-            if weather_resp.status == 200:
-                weather_data = await weather_resp.json()
-                weather_data['name'] = official_name
-                weather_data['sys']['country'] = country
-                return weather_data
+# --- HTTP Session ---
+# One shared session for the whole bot so repeat lookups reuse pooled
+# keep-alive connections instead of handshaking with the API every time.
+bot.http_session = None
+
+def get_session() -> aiohttp.ClientSession:
+    """Returns the shared aiohttp session, creating it on first use."""
+    if bot.http_session is None or bot.http_session.closed:
+        bot.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=20,
+                keepalive_timeout=75,
+                # c-ares (aiodns) instead of threaded getaddrinfo, cached for 10 min
+                resolver=aiohttp.AsyncResolver(),
+                use_dns_cache=True,
+                ttl_dns_cache=600
+            ),
+            timeout=aiohttp.ClientTimeout(total=5, connect=2)
+        )
+    return bot.http_session
+
+# --- Caches ---
+# A zip never moves, so zip geocodes are only evicted for space (LRU).
+# City names can be re-pointed upstream, so those expire after a day.
+_zip_cache = LRUCache(maxsize=4096)
+_geo_cache = TTLCache(maxsize=4096, ttl=86400)
+# OWM refreshes station data about every 10 minutes, so anything fresher
+# than that is the same answer.
+_wx_cache = TTLCache(maxsize=2048, ttl=600)
+# Lookups currently running, keyed on (normalized query, units)
+_inflight = {}
+
+async def fetch_json(session: aiohttp.ClientSession, url: yarl.URL, params: dict | None = None):
+    """GETs a URL and decodes the body with orjson; None on a non-200 response."""
+    async with session.get(url, params=params) as resp:
+        if resp.status != 200:
             return None
+        return orjson.loads(await resp.read())
+
+async def zippopotam_lookup(session: aiohttp.ClientSession, zip_code: str) -> tuple | None:
+    """Resolves a US zip through Zippopotam to (lat, lon, name, country)."""
+    # We use this to get the "Postal City" name (e.g. Highlands Ranch)
+    # instead of the County name (Douglas County).
+    zip_data = await fetch_json(session, ZIPPO_URL / zip_code)
+    if not zip_data:
+        return None
+    place = zip_data['places'][0]
+    return (place['latitude'], place['longitude'], place['place name'], "US")
+
+async def owm_lookup(session: aiohttp.ClientSession, url: yarl.URL, params: dict) -> tuple | None:
+    """Resolves a query through an OWM geocoding endpoint to (lat, lon, name, country)."""
+    geo_data = await fetch_json(session, url, params)
+
+    # /zip returns a single place, /direct a list of matches
+    if isinstance(geo_data, list):
+        geo_data = geo_data[0] if geo_data else None
+    if not geo_data:
+        return None
+    return (geo_data['lat'], geo_data['lon'], geo_data['name'], geo_data.get('country', 'US'))
+
+def _log_zip_write(zip_code: str, fut: asyncio.Future) -> None:
+    if not fut.cancelled() and fut.exception() is not None:
+        print(f"Saving zip {zip_code} failed: {fut.exception()}")
+
+def persist_zip(zip_code: str, result: tuple) -> None:
+    """Saves a Zippopotam zip geocode in the background, off the reply path."""
+    lat, lon, name, _ = result
+    fut = db_write(SAVE_ZIP_SQL, (zip_code, float(lat), float(lon), name))
+    fut.add_done_callback(functools.partial(_log_zip_write, zip_code))
+
+def _upgrade_zip(zip_code: str, task: asyncio.Task) -> None:
+    """Swaps in Zippopotam's answer for a zip that OWM resolved first."""
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        print(f"Zip lookup failed: {task.exception()}")
+        return
+    result = task.result()
+    if result is not None:
+        _zip_cache[zip_code] = result
+        _geo_cache.pop(zip_code, None)
+        persist_zip(zip_code, result)
+
+async def geocode(session: aiohttp.ClientSession, query: str) -> tuple | None:
+    """Resolves a query to (lat, lon, name, country), or None if not found."""
+    clean = query.strip()
+    zip_match = _ZIP_RE.match(clean)
+    zip_code = zip_match.group(1) if zip_match else None
+
+    if not zip_code:
+        # --- CITY NAMES: standard OWM direct geocoding ---
+        key = clean.lower()
+        if key in _geo_cache:
+            return _geo_cache[key]
+        result = await owm_lookup(session, GEO_DIRECT_URL, {'q': clean, 'limit': 1, 'appid': WEATHER_API_KEY})
+        if result is not None:
+            _geo_cache[key] = result
+        return result
+
+    # --- US ZIP CODES ---
+    # Zippopotam answers live in _zip_cache for good; an OWM answer only
+    # sits in the day-long _geo_cache until Zippopotam can supply the
+    # postal city name.
+    result = _zip_cache.get(zip_code) or _geo_cache.get(zip_code)
+    if result is not None:
+        return result
+
+    # Saved from an earlier lookup?
+    result = await asyncio.to_thread(load_zip, zip_code)
+    if result is not None:
+        _zip_cache[zip_code] = result
+        return result
+
+    # Otherwise race Zippopotam against OWM's zip endpoint. Zippopotam has
+    # the nicer postal city name, but we take whichever answers first with
+    # coordinates rather than waiting on a slow one.
+    zippo_task = asyncio.create_task(zippopotam_lookup(session, zip_code))
+    owm_task = asyncio.create_task(owm_lookup(session, GEO_ZIP_URL, {'zip': f"{zip_code},US", 'appid': WEATHER_API_KEY}))
+    pending = {zippo_task, owm_task}
+    result = winner = None
+    try:
+        while pending and result is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # If both land together, prefer Zippopotam's name
+            for task in sorted(done, key=lambda t: t is not zippo_task):
+                if task.exception() is not None:
+                    print(f"Zip lookup failed: {task.exception()}")
+                elif result is None and task.result() is not None:
+                    result, winner = task.result(), task
+    finally:
+        for task in pending:
+            if task is zippo_task and result is not None:
+                # OWM won; let Zippopotam finish and upgrade the name later
+                task.add_done_callback(functools.partial(_upgrade_zip, zip_code))
+            else:
+                task.cancel()
+
+    if winner is zippo_task:
+        _zip_cache[zip_code] = result
+        persist_zip(zip_code, result)
+    elif result is not None:
+        _geo_cache[zip_code] = result
+    return result
+
+async def fetch_weather(session: aiohttp.ClientSession, lat, lon, units: str) -> dict | None:
+    """Returns the current-weather payload for a point, or None on failure.
+
+    The payload may be shared through the cache, so callers must not modify it.
+    """
+    # Lookups within ~0.1° (roughly 10 km) share one cached payload
+    cache_key = (round(float(lat), 1), round(float(lon), 1), units)
+    weather_data = _wx_cache.get(cache_key)
+
+    if weather_data is None:
+        params = {'lat': lat, 'lon': lon, 'appid': WEATHER_API_KEY, 'units': units}
+        weather_data = await fetch_json(session, WEATHER_URL, params)
+        if weather_data is None:
+            return None
+        _wx_cache[cache_key] = weather_data
+    return weather_data
+
+async def lookup_weather(query: str, units: str) -> dict | None:
+    """Geocodes a query and returns its weather with the display name applied."""
+    session = get_session()
+
+    coords = await geocode(session, query)
+    if coords is None:
+        return None
+    lat, lon, official_name, country = coords
+
+    weather_data = await fetch_weather(session, lat, lon, units)
+    if weather_data is None:
+        return None
+
+    # Copy before renaming so the cached payload stays untouched
+    result = dict(weather_data)
+    result['name'] = official_name
+    result['sys'] = dict(weather_data['sys'], country=country)
+    return result
+
+async def get_weather_data(query: str, units: str) -> dict | None:
+    """Returns weather for a query; identical concurrent requests share one lookup."""
+    key = (query.strip().lower(), units)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(lookup_weather(query, units))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller giving up doesn't cancel the lookup for the rest
+    return await asyncio.shield(task)
+
+@functools.lru_cache(maxsize=128)
+def describe(description: str) -> str:
+    """Capitalizes an OWM condition description (a small, fixed vocabulary)."""
+    return description.capitalize()
+
+def make_embed(data: dict, units: str, footer: str) -> discord.Embed:
+    """Builds the weather embed for a get_weather_data() result."""
+    temp_label, speed_label = LABELS[units]
+    main = data['main']
+    condition = data['weather'][0]
+
+    values = (
+        f"{main['temp']:.1f}{temp_label}",
+        f"{main['feels_like']:.1f}{temp_label}",
+        f"{main['humidity']}%",
+        f"{data['wind']['speed']} {speed_label}",
+    )
+
+    # Built straight from a dict: one from_dict() instead of a call per field
+    return discord.Embed.from_dict({
+        **_EMBED_TEMPLATE,
+        'title': f"Weather in {data['name']}, {data['sys']['country']}",
+        'description': f"**{describe(condition['description'])}**",
+        # --- THE ICON UPGRADE ---
+        # We use the @4x URL to get a large, crisp PNG image.
+        'thumbnail': {'url': f"{ICON_BASE}{condition['icon']}@4x.png"},
+        'fields': [
+            {'name': name, 'value': value, 'inline': True}
+            for name, value in zip(_EMBED_FIELDS, values)
+        ],
+        'footer': {'text': footer},
+    })
 
 @bot.event
 async def on_ready():
@@ -95,136 +459,103 @@ async def on_ready():
     await bot.change_presence(activity=discord.Game(name="the Weather"))
 
 @bot.command(aliases=['u', 'unit'])
-async def units(ctx, preference: str):
+async def units(ctx: commands.Context, preference: str):
     """Sets the user's preferred units (metric/imperial)."""
     user_id = ctx.author.id
     preference = preference.lower()
     
-    if preference in ['c', 'metric', 'celsius', 'ca']:
+    if preference in _METRIC:
         new_unit = 'metric'
         display = "Metric (°C, m/s)"
-    elif preference in ['f', 'imperial', 'fahrenheit', 'us']:
+    elif preference in _IMPERIAL:
         new_unit = 'imperial'
         display = "Imperial (°F, mph)"
     else:
         await ctx.send("❓ Please specify **metric** (C) or **imperial** (F).")
         return
 
-    cursor.execute('''
-        INSERT INTO users (user_id, units) VALUES (?, ?)
-        ON CONFLICT(user_id) DO UPDATE SET units=excluded.units
-    ''', (user_id, new_unit))
-    conn.commit()
+    await save_profile(user_id, 'units', new_unit)
     await ctx.send(f"✅ Preferences updated! I will now show you weather in **{display}**.")
 
 @bot.command(aliases=['wx', 'we', 'wea']) 
-async def weather(ctx, *, location: str = None):
+async def weather(ctx: commands.Context, *, location: str | None = None):
     # Default target is the author
     target_user_id = ctx.author.id
+    target_member = None
     search_query = None
+    save = None
     
     # 1. Check Input (Is it a Location or a User Mention?)
     if location:
         try:
+            # Only a mention, a raw user id or @name can be a user, so a
+            # zip or city never triggers a speculative member lookup.
+            candidate = location.strip()
+            if candidate.startswith('@'):
+                candidate = candidate[1:]
+            elif not _MENTION_RE.match(candidate):
+                raise commands.BadArgument(location)
+
             # Try to convert input to a User (e.g. .wx @Friend)
             converter = commands.MemberConverter()
-            target_member = await converter.convert(ctx, location)
+            target_member = await converter.convert(ctx, candidate)
             
             # If successful, we are looking up THAT user
             target_user_id = target_member.id
             
-            # Read-Only lookup
-            cursor.execute('SELECT location FROM users WHERE user_id = ?', (target_user_id,))
-            result = cursor.fetchone()
+            # Read-Only lookup (their location and units in one go)
+            search_query, units_to_use = get_profile(target_user_id)
             
-            if result:
-                search_query = result[0]
-            else:
+            if not search_query:
                 await ctx.send(f"❌ **{target_member.display_name}** hasn't set their location yet!")
                 return
                 
         except commands.BadArgument:
             # Input is NOT a user, so it's a City/Zip.
-            # Save this to the AUTHOR'S profile.
-            
-            # Fetch existing units to preserve them
-            cursor.execute('SELECT units FROM users WHERE user_id = ?', (ctx.author.id,))
-            res = cursor.fetchone()
-            user_units = res[0] if res and res[0] else 'imperial'
+            # Save this to the AUTHOR'S profile, keeping their saved units.
+            units_to_use = get_profile(ctx.author.id)[1]
             
-            cursor.execute('''
-                INSERT INTO users (user_id, location, units) VALUES (?, ?, ?)
-                ON CONFLICT(user_id) DO UPDATE SET location=excluded.location
-            ''', (ctx.author.id, location, user_units))
-            conn.commit()
+            # The write is awaited together with the lookup below
+            save = save_profile(ctx.author.id, 'location', location)
             
             search_query = location
 
     else:
         # No input, check Author's saved location
-        cursor.execute('SELECT location FROM users WHERE user_id = ?', (target_user_id,))
-        result = cursor.fetchone()
-        if result:
-            search_query = result[0]
-        else:
+        search_query, units_to_use = get_profile(target_user_id)
+        if not search_query:
             await ctx.send("❌ **No location found!**\nPlease type `.wx <ZipCode>` or `.wx <City>`.")
             return
 
-    # 2. Get Units for the TARGET user
-    cursor.execute('SELECT units FROM users WHERE user_id = ?', (target_user_id,))
-    res = cursor.fetchone()
-    units_to_use = res[0] if res and res[0] else 'imperial'
-
-    # 3. Fetch Data
-    data = await get_weather_data(search_query, units_to_use)
+    # 2. Fetch Data (overlapping the profile save, if any)
+    if save is not None:
+        data, _ = await asyncio.gather(get_weather_data(search_query, units_to_use), save)
+    else:
+        data = await get_weather_data(search_query, units_to_use)
     
     if data:
-        city = data['name']
-        country = data['sys']['country']
-        temp = data['main']['temp']
-        feels_like = data['main']['feels_like']
-        humidity = data['main']['humidity']
-        wind_speed = data['wind']['speed']
-        condition = data['weather'][0]['description'].capitalize()
-        icon_code = data['weather'][0]['icon']
-        
-        # Set labels
-        if units_to_use == 'imperial':
-            temp_label = "°F"
-            speed_label = "mph"
-        else:
-            temp_label = "°C"
-            speed_label = "m/s"
-
-        embed = discord.Embed(
-            title=f"Weather in {city}, {country}",
-            description=f"**{condition}**",
-            color=0x3498db
-        )
-        
-        # --- THE ICON UPGRADE ---
-        # We use the @4x URL to get a large, crisp PNG image.
-        icon_url = f"http://openweathermap.org/img/wn/{icon_code}@4x.png"
-        embed.set_thumbnail(url=icon_url)
-
-        embed.add_field(name="Temperature", value=f"{round(temp, 1)}{temp_label}", inline=True)
-        embed.add_field(name="Feels Like", value=f"{round(feels_like, 1)}{temp_label}", inline=True)
-        embed.add_field(name="Humidity", value=f"{humidity}%", inline=True)
-        embed.add_field(name="Wind Speed", value=f"{wind_speed} {speed_label}", inline=True)
-        
-        # Smart Footer
+        # Smart Footer (the member was already resolved above, so no
+        # extra Discord API call is needed for their name)
         req_text = f"Requested by {ctx.author.display_name}"
         if target_user_id != ctx.author.id:
-            try:
-                target_user = await bot.fetch_user(target_user_id)
-                req_text += f" • For {target_user.display_name}"
-            except:
-                pass
-        embed.set_footer(text=req_text)
+            req_text += f" • For {target_member.display_name}"
 
-        await ctx.send(embed=embed)
+        await ctx.send(embed=make_embed(data, units_to_use, req_text))
     else:
         await ctx.send(f"⚠️ Could not find location **'{search_query}'**.")
 
+async def main():
+    discord.utils.setup_logging()
+    async with bot:
+        try:
+            await bot.start(TOKEN)
+        finally:
+            # Close the shared session on shutdown
+            if bot.http_session is not None:
+                await bot.http_session.close()
+
 if __name__ == "__main__":
-    bot.run(TOKEN)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass